@@ -4,9 +4,12 @@ import os
 import shutil
 import tempfile
 import xml.etree.ElementTree as ET
+import zipfile
 from argparse import ArgumentParser
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from datasets.commands import BaseTransformersCLICommand
 from datasets.load import import_main_class, prepare_module
@@ -20,6 +23,7 @@ from datasets.utils.py_utils import map_nested
 logger = get_logger(__name__)
 
 DEFAULT_ENCODING = "utf-8"
+LINE_BY_LINE_EXTENSIONS = (".txt", ".csv", ".jsonl", ".tsv")
 
 
 def test_command_factory(args):
@@ -33,25 +37,38 @@ def test_command_factory(args):
         args.keep_uncompressed,
         args.cache_dir,
         args.encoding,
+        args.num_proc,
     )
 
 
 class DummyDataGeneratorDownloadManager(DownloadManager):
-    def __init__(self, mock_download_manager, *args, **kwargs):
+    def __init__(self, mock_download_manager, *args, download_cache: Optional[Dict[str, str]] = None, **kwargs):
         super().__init__(*args, **kwargs)
         self.mock_download_manager = mock_download_manager
         self.downloaded_paths = []
         self.expected_dummy_paths = []
+        # {url: downloaded_path}, can be shared between the download managers of several configs.
+        # Sizes and checksums are only recorded by the manager that actually downloaded the url.
+        self.download_cache = download_cache if download_cache is not None else {}
+
+    def _cached_download(self, url_or_urls):
+        urls = []
+        map_nested(urls.append, url_or_urls, map_tuple=True)
+        # only download (and compute the checksums of) the urls that were not downloaded yet
+        missing_urls = [url for url in dict.fromkeys(urls) if url not in self.download_cache]
+        if missing_urls:
+            self.download_cache.update(zip(missing_urls, super().download(missing_urls)))
+        return map_nested(self.download_cache.__getitem__, url_or_urls, map_tuple=True)
 
     def download(self, url_or_urls):
-        output = super().download(url_or_urls)
+        output = self._cached_download(url_or_urls)
         dummy_output = self.mock_download_manager.download(url_or_urls)
         map_nested(self.downloaded_paths.append, output, map_tuple=True)
         map_nested(self.expected_dummy_paths.append, dummy_output, map_tuple=True)
         return output
 
     def download_and_extract(self, url_or_urls):
-        output = super().extract(super().download(url_or_urls))
+        output = super().extract(self._cached_download(url_or_urls))
         dummy_output = self.mock_download_manager.download(url_or_urls)
         map_nested(self.downloaded_paths.append, output, map_tuple=True)
         map_nested(self.expected_dummy_paths.append, dummy_output, map_tuple=True)
@@ -64,6 +81,7 @@ class DummyDataGeneratorDownloadManager(DownloadManager):
         xml_tag: Optional[str] = None,
         match_text_files: Optional[str] = None,
         encoding: Optional[str] = None,
+        num_proc: Optional[int] = None,
     ) -> bool:
         os.makedirs(
             os.path.join(
@@ -74,24 +92,30 @@ class DummyDataGeneratorDownloadManager(DownloadManager):
             ),
             exist_ok=True,
         )
-        total = 0
         self.mock_download_manager.load_existing_dummy_data = False
-        for src_path, relative_dst_path in zip(self.downloaded_paths, self.expected_dummy_paths):
-            dst_path = os.path.join(
-                self.mock_download_manager.datasets_scripts_dir,
-                self.mock_download_manager.dataset_name,
-                self.mock_download_manager.dummy_data_folder,
-                relative_dst_path,
-            )
-            total += self._create_dummy_data(
+        src_and_dst_paths = [
+            (
                 src_path,
-                dst_path,
-                n_lines=n_lines,
-                json_field=json_field,
-                xml_tag=xml_tag,
-                match_text_files=match_text_files,
-                encoding=encoding,
+                os.path.join(
+                    self.mock_download_manager.datasets_scripts_dir,
+                    self.mock_download_manager.dataset_name,
+                    self.mock_download_manager.dummy_data_folder,
+                    relative_dst_path,
+                ),
             )
+            # the same url can be downloaded several times: only create its dummy data once
+            for src_path, relative_dst_path in dict.fromkeys(zip(self.downloaded_paths, self.expected_dummy_paths))
+        ]
+        # each dummy file is created independently so they can be generated in parallel
+        create_dummy_data = partial(
+            self._create_dummy_data_from_paths,
+            n_lines=n_lines,
+            json_field=json_field,
+            xml_tag=xml_tag,
+            match_text_files=match_text_files,
+            encoding=encoding,
+        )
+        total = sum(map_nested(create_dummy_data, src_and_dst_paths, num_proc=num_proc))
         if total == 0:
             logger.error(
                 "Dummy data generation failed: no dummy files were created. "
@@ -99,6 +123,10 @@ class DummyDataGeneratorDownloadManager(DownloadManager):
             )
         return total > 0
 
+    def _create_dummy_data_from_paths(self, src_and_dst_paths: Tuple[str, str], **kwargs) -> int:
+        src_path, dst_path = src_and_dst_paths
+        return self._create_dummy_data(src_path, dst_path, **kwargs)
+
     def _create_dummy_data(
         self,
         src_path: str,
@@ -112,22 +140,18 @@ class DummyDataGeneratorDownloadManager(DownloadManager):
         encoding = encoding or DEFAULT_ENCODING
         if os.path.isfile(src_path):
             logger.debug(f"Trying to generate dummy data file {dst_path}")
-            line_by_line_extensions = [".txt", ".csv", ".jsonl", ".tsv"]
-            is_line_by_line_text_file = any(dst_path.endswith(extension) for extension in line_by_line_extensions)
-            if match_text_files is not None:
+            is_line_by_line_text_file = dst_path.endswith(LINE_BY_LINE_EXTENSIONS)
+            if not is_line_by_line_text_file and match_text_files is not None:
                 file_name = os.path.basename(dst_path)
-                for pattern in match_text_files.split(","):
-                    is_line_by_line_text_file |= fnmatch.fnmatch(file_name, pattern)
+                is_line_by_line_text_file = any(
+                    fnmatch.fnmatch(file_name, pattern) for pattern in match_text_files.split(",")
+                )
             # Line by line text file (txt, csv etc.)
             if is_line_by_line_text_file:
                 Path(dst_path).parent.mkdir(exist_ok=True, parents=True)
                 with open(src_path, "r", encoding=encoding) as src_file:
                     with open(dst_path, "w", encoding=encoding) as dst_file:
-                        first_lines = []
-                        for i, line in enumerate(src_file):
-                            if i >= n_lines:
-                                break
-                            first_lines.append(line)
+                        first_lines = islice(src_file, n_lines)
                         dst_file.write("".join(first_lines).strip())
                 return 1
             # json file
@@ -208,9 +232,21 @@ class DummyDataGeneratorDownloadManager(DownloadManager):
     def compress_autogenerated_dummy_data(self, path_to_dataset):
         root_dir = os.path.join(path_to_dataset, self.mock_download_manager.dummy_data_folder)
         base_name = os.path.join(root_dir, "dummy_data")
-        base_dir = "dummy_data"
         logger.info(f"Compressing dummy data folder to '{base_name}.zip'")
-        shutil.make_archive(base_name, "zip", root_dir, base_dir)
+        # stored (uncompressed) sorted entries with a fixed timestamp and permissions: the dummy files are small,
+        # and re-generating the same dummy data gives the exact same archive
+        with zipfile.ZipFile(base_name + ".zip", "w", compression=zipfile.ZIP_STORED) as zip_file:
+            for path, dirs, files in os.walk(base_name):
+                dirs.sort()
+                dir_info = zipfile.ZipInfo(os.path.relpath(path, root_dir).replace(os.sep, "/") + "/")
+                dir_info.external_attr = (0o40755 << 16) | 0x10  # directory flag for unix and MS-DOS
+                zip_file.writestr(dir_info, b"")
+                for name in sorted(files):
+                    file_path = os.path.join(path, name)
+                    file_info = zipfile.ZipInfo(os.path.relpath(file_path, root_dir).replace(os.sep, "/"))
+                    file_info.external_attr = 0o644 << 16
+                    with open(file_path, "rb") as src_file, zip_file.open(file_info, "w") as dst_file:
+                        shutil.copyfileobj(src_file, dst_file, 1 << 20)
         shutil.rmtree(base_name)
 
 
@@ -257,6 +293,12 @@ class DummyDataCommand(BaseTransformersCLICommand):
             default=None,
             help=f"Encoding to use when auto-generating dummy data. Defaults to {DEFAULT_ENCODING}",
         )
+        test_parser.add_argument(
+            "--num_proc",
+            type=int,
+            default=None,
+            help="Optional, number of processes to use to create the dummy data files when auto-generating dummy data",
+        )
         test_parser.add_argument("path_to_dataset", type=str, help="Path to the dataset (example: ./datasets/squad)")
         test_parser.set_defaults(func=test_command_factory)
 
@@ -271,6 +313,7 @@ class DummyDataCommand(BaseTransformersCLICommand):
         keep_uncompressed: bool,
         cache_dir: Optional[str],
         encoding: Optional[str],
+        num_proc: Optional[int] = None,
     ):
         self._path_to_dataset = path_to_dataset
         if os.path.isdir(path_to_dataset):
@@ -286,6 +329,7 @@ class DummyDataCommand(BaseTransformersCLICommand):
         self._keep_uncompressed = keep_uncompressed
         self._cache_dir = cache_dir
         self._encoding = encoding
+        self._num_proc = num_proc
 
     def run(self):
         set_verbosity_warning()
@@ -295,6 +339,8 @@ class DummyDataCommand(BaseTransformersCLICommand):
         # use `None` as config if no configs
         configs = builder_cls.BUILDER_CONFIGS or [None]
         auto_generate_results = []
+        # the configs of a dataset often share the same data files: download them only once
+        download_cache = {}
         with tempfile.TemporaryDirectory() as tmp_dir:
             for config in configs:
                 if config is None:
@@ -319,6 +365,7 @@ class DummyDataCommand(BaseTransformersCLICommand):
                             dataset_builder=dataset_builder,
                             mock_dl_manager=mock_dl_manager,
                             keep_uncompressed=self._keep_uncompressed,
+                            download_cache=download_cache,
                         )
                     )
                 else:
@@ -331,11 +378,16 @@ class DummyDataCommand(BaseTransformersCLICommand):
                 else:
                     print(f"Automatic dummy data generation failed for some configs of '{self._path_to_dataset}'")
 
-    def _autogenerate_dummy_data(self, dataset_builder, mock_dl_manager, keep_uncompressed) -> Optional[bool]:
+    def _autogenerate_dummy_data(
+        self, dataset_builder, mock_dl_manager, keep_uncompressed, download_cache=None
+    ) -> Optional[bool]:
         dl_cache_dir = os.path.join(self._cache_dir or HF_DATASETS_CACHE, "downloads")
         download_config = DownloadConfig(cache_dir=dl_cache_dir)
         dl_manager = DummyDataGeneratorDownloadManager(
-            dataset_name=self._dataset_name, mock_download_manager=mock_dl_manager, download_config=download_config
+            dataset_name=self._dataset_name,
+            mock_download_manager=mock_dl_manager,
+            download_config=download_config,
+            download_cache=download_cache,
         )
         dataset_builder._split_generators(dl_manager)
         mock_dl_manager.load_existing_dummy_data = False  # don't use real dummy data
@@ -345,6 +397,7 @@ class DummyDataCommand(BaseTransformersCLICommand):
             xml_tag=self._xml_tag,
             match_text_files=self._match_text_files,
             encoding=self._encoding,
+            num_proc=self._num_proc,
         )
         if not keep_uncompressed:
             path_do_dataset = os.path.join(mock_dl_manager.datasets_scripts_dir, mock_dl_manager.dataset_name)
@@ -398,34 +451,61 @@ class DummyDataCommand(BaseTransformersCLICommand):
             print(
                 f"Dataset {self._dataset_name} with config {config} seems to already open files in the method `_split_generators(...)`. You might consider to instead only open files in the method `_generate_examples(...)` instead. If this is not possible the dummy data has to be created with less guidance. Make sure you create the file {e.filename}."
             )
+            # there are no split generators to inspect
+            return
 
         files_to_create = set()
         split_names = []
         dummy_file_name = mock_dl_manager.dummy_file_name
 
+        dummy_data_guidance_print = "\n" + 30 * "=" + "DUMMY DATA INSTRUCTIONS" + 30 * "=" + "\n"
+        config_string = f"config {config.name} of " if config is not None else ""
+        dummy_data_guidance_print += (
+            "- In order to create the dummy data for "
+            + config_string
+            + f"{self._dataset_name}, please go into the folder '{dummy_data_folder}' with `cd {dummy_data_folder}` . \n\n"
+        )
+        uses_glob = False
+
         for split in generator_splits:
             logger.info(f"Collecting dummy data file paths to create for {split.name}")
             split_names.append(split.name)
             gen_kwargs = split.gen_kwargs
-            generator = dataset_builder._generate_examples(**gen_kwargs)
 
-            try:
-                dummy_data_guidance_print = "\n" + 30 * "=" + "DUMMY DATA INSTRUCTIONS" + 30 * "=" + "\n"
-                config_string = f"config {config.name} of " if config is not None else ""
-                dummy_data_guidance_print += (
-                    "- In order to create the dummy data for "
-                    + config_string
-                    + f"{self._dataset_name}, please go into the folder '{dummy_data_folder}' with `cd {dummy_data_folder}` . \n\n"
-                )
+            # dummy data paths that are passed as is to `_generate_examples(...)` can be found without running it
+            gen_kwargs_values = []
+            map_nested(gen_kwargs_values.append, gen_kwargs, map_tuple=True)
+            missing_dummy_paths = [
+                value
+                for value in gen_kwargs_values
+                if isinstance(value, str)
+                and value.replace(os.sep, "/").split("/")[0] == dummy_file_name
+                and not os.path.exists(value)
+            ]
+            # directories such as an extracted `data_dir` are parents of other paths, only list the files
+            missing_dummy_paths = [
+                path
+                for path in missing_dummy_paths
+                if not any(other.startswith(os.path.join(path, "")) for other in missing_dummy_paths)
+            ]
+            if missing_dummy_paths:
+                files_to_create.update(missing_dummy_paths)
+                continue
 
-                # trigger generate function
+            generator = dataset_builder._generate_examples(**gen_kwargs)
+            try:
+                # trigger generate function: it has to run until the end since it may open its files one after
+                # the other. It is only run when no missing files were found in gen_kwargs.
                 for key, record in generator:
                     pass
-
-                dummy_data_guidance_print += f"- It appears that the function `_generate_examples(...)` expects one or more files in the folder {dummy_file_name} using the function `glob.glob(...)`. In this case, please refer to the `_generate_examples(...)` method to see under which filename the dummy data files should be created. \n\n"
-
+                uses_glob = True
             except FileNotFoundError as e:
                 files_to_create.add(e.filename)
+            finally:
+                generator.close()
+
+        if uses_glob:
+            dummy_data_guidance_print += f"- It appears that the function `_generate_examples(...)` expects one or more files in the folder {dummy_file_name} using the function `glob.glob(...)`. In this case, please refer to the `_generate_examples(...)` method to see under which filename the dummy data files should be created. \n\n"
 
         split_names = ", ".join(split_names)
         if len(files_to_create) > 0:
@@ -1,11 +1,16 @@
 import os
 import shutil
+import zipfile
+from contextlib import redirect_stdout
+from io import StringIO
 from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import patch
 
 from datasets.builder import DatasetInfo, DownloadConfig, GeneratorBasedBuilder, Split, SplitGenerator
-from datasets.commands.dummy_data import DummyDataGeneratorDownloadManager, MockDownloadManager
+from datasets.commands.dummy_data import DummyDataCommand, DummyDataGeneratorDownloadManager, MockDownloadManager
 from datasets.features import Features, Value
+from datasets.utils.download_manager import DownloadManager
 from datasets.utils.version import Version
 
 
@@ -34,6 +39,79 @@ class DummyBuilder(GeneratorBasedBuilder):
                 yield i, {"text": line.strip()}
 
 
+class DummyBuilderWithDataDir(GeneratorBasedBuilder):
+    def _info(self) -> DatasetInfo:
+        return DatasetInfo(features=Features({"text": Value("string")}))
+
+    def _split_generators(self, dl_manager):
+        data_dir = os.path.join(dl_manager.download_and_extract("https://foo.bar/movies.tar.gz"), "movies")
+        return [
+            SplitGenerator(
+                Split.TRAIN,
+                gen_kwargs={"data_dir": data_dir, "filepath": os.path.join(data_dir, "train.jsonl")},
+            ),
+        ]
+
+    def _generate_examples(self, data_dir, filepath):
+        with open(filepath, "r", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                yield i, {"text": line.strip()}
+
+
+class DummyBuilderWithFileLists(GeneratorBasedBuilder):
+    def _info(self) -> DatasetInfo:
+        return DatasetInfo(features=Features({"text": Value("string")}))
+
+    def _split_generators(self, dl_manager):
+        return [
+            SplitGenerator(
+                Split.TEST,
+                gen_kwargs={
+                    "source_files": dl_manager.download_and_extract(
+                        [f"https://foo.bar/source{i}.txt" for i in range(2)]
+                    ),
+                    "target_files": dl_manager.download_and_extract(
+                        [f"https://foo.bar/target{i}.txt" for i in range(2)]
+                    ),
+                },
+            ),
+        ]
+
+    def _generate_examples(self, source_files, target_files):
+        for source_file, target_file in zip(source_files, target_files):
+            with open(source_file, "r", encoding="utf-8") as sf, open(target_file, "r", encoding="utf-8") as tf:
+                for i, (source_row, target_row) in enumerate(zip(sf, tf)):
+                    yield f"{source_file}_{i}", {"text": source_row.strip() + target_row.strip()}
+
+
+class DummyBuilderWithFilesInDataDir(GeneratorBasedBuilder):
+    def _info(self) -> DatasetInfo:
+        return DatasetInfo(features=Features({"text": Value("string")}))
+
+    def _split_generators(self, dl_manager):
+        data_dir = dl_manager.download_and_extract("https://foo.bar/files.zip")
+        return [SplitGenerator(Split.TRAIN, gen_kwargs={"data_dir": data_dir})]
+
+    def _generate_examples(self, data_dir):
+        for i in range(5):
+            with open(os.path.join(data_dir, f"f{i}.txt"), "r", encoding="utf-8") as f:
+                for j, line in enumerate(f):
+                    yield f"{i}_{j}", {"text": line.strip()}
+
+
+class DummyBuilderOpeningFilesInSplitGenerators(GeneratorBasedBuilder):
+    def _info(self) -> DatasetInfo:
+        return DatasetInfo(features=Features({"text": Value("string")}))
+
+    def _split_generators(self, dl_manager):
+        filepath = dl_manager.download_and_extract("https://foo.bar/splits.txt")
+        with open(filepath, "r", encoding="utf-8") as f:
+            return [SplitGenerator(split_name.strip(), gen_kwargs={"filepath": filepath}) for split_name in f]
+
+    def _generate_examples(self, filepath):
+        yield 0, {"text": ""}
+
+
 class DummyDataAutoGenerationTest(TestCase):
     def test_dummy_data_autogenerate(self):
         n_lines = 5
@@ -78,3 +156,171 @@ class DummyDataAutoGenerationTest(TestCase):
             dataset = dataset_builder.as_dataset(split="train")
             self.assertEqual(len(dataset), n_lines)
             del dataset
+
+    def test_dummy_data_autogenerate_num_proc(self):
+        n_lines = 5
+        num_proc = 2
+
+        with TemporaryDirectory() as tmp_dir:
+            # more files than processes, so that map_nested actually uses a pool of workers
+            to_dl = {}
+            for i in range(5):
+                file_path = os.path.join(tmp_dir, f"train{i}.txt")
+                with open(file_path, "w", encoding="utf-8") as f:
+                    f.write("foo\nbar\n" * 10)
+                to_dl[f"train{i}"] = file_path
+
+            mock_dl_manager = MockDownloadManager(
+                dataset_name="dummy_builder",
+                config=None,
+                version=Version("0.0.0"),
+                is_local=True,
+                load_existing_dummy_data=False,
+            )
+            # an instance attribute (instead of a local subclass) keeps the manager picklable
+            mock_dl_manager.datasets_scripts_dir = os.path.join(tmp_dir, "datasets")
+            download_config = DownloadConfig(cache_dir=os.path.join(tmp_dir, "downloads"))
+            dl_manager = DummyDataGeneratorDownloadManager(
+                dataset_name="dummy_builder",
+                mock_download_manager=mock_dl_manager,
+                download_config=download_config,
+            )
+            dl_manager.download_and_extract(to_dl)
+            self.assertTrue(dl_manager.auto_generate_dummy_data_folder(n_lines=n_lines, num_proc=num_proc))
+
+            dummy_data_dir = os.path.join(
+                mock_dl_manager.datasets_scripts_dir,
+                mock_dl_manager.dataset_name,
+                mock_dl_manager.dummy_data_folder,
+                "dummy_data",
+            )
+            for key in to_dl:
+                with open(os.path.join(dummy_data_dir, key + ".txt"), encoding="utf-8") as f:
+                    self.assertEqual(len(f.read().splitlines()), n_lines)
+
+    def test_dummy_data_generator_download_cache(self):
+        with TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "train.txt")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write("foo\nbar\n")
+
+            download_cache = {}
+            dl_managers = [
+                DummyDataGeneratorDownloadManager(
+                    dataset_name="dummy_builder",
+                    mock_download_manager=MockDownloadManager(
+                        dataset_name="dummy_builder",
+                        config=None,
+                        version=Version("0.0.0"),
+                        is_local=True,
+                        load_existing_dummy_data=False,
+                    ),
+                    download_config=DownloadConfig(cache_dir=os.path.join(tmp_dir, "downloads")),
+                    download_cache=download_cache,
+                )
+                for _ in range(2)
+            ]
+            with patch.object(DownloadManager, "download", autospec=True, return_value=[file_path]) as mock_download:
+                downloaded_paths = [dl_manager.download(file_path) for dl_manager in dl_managers]
+            self.assertEqual(mock_download.call_count, 1)
+            self.assertEqual(downloaded_paths, [file_path, file_path])
+            self.assertEqual(download_cache, {file_path: file_path})
+
+    def test_compress_autogenerated_dummy_data_is_reproducible(self):
+        with TemporaryDirectory() as tmp_dir:
+            mock_dl_manager = MockDownloadManager(
+                dataset_name="dummy_builder",
+                config=None,
+                version=Version("0.0.0"),
+                is_local=True,
+                load_existing_dummy_data=False,
+            )
+            dl_manager = DummyDataGeneratorDownloadManager(
+                dataset_name="dummy_builder",
+                mock_download_manager=mock_dl_manager,
+                download_config=DownloadConfig(cache_dir=os.path.join(tmp_dir, "downloads")),
+            )
+            dummy_data_dir = os.path.join(tmp_dir, mock_dl_manager.dummy_data_folder, "dummy_data")
+
+            archives = []
+            for mtime in (0, 10 ** 9):
+                for name in ("train.txt", os.path.join("nested", "test.txt")):
+                    file_path = os.path.join(dummy_data_dir, name)
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    with open(file_path, "w", encoding="utf-8") as f:
+                        f.write("foo\nbar")
+                    os.utime(file_path, (mtime, mtime))
+                dl_manager.compress_autogenerated_dummy_data(tmp_dir)
+                with open(dummy_data_dir + ".zip", "rb") as f:
+                    archives.append(f.read())
+            self.assertEqual(archives[0], archives[1])
+
+            with zipfile.ZipFile(dummy_data_dir + ".zip") as zip_file:
+                infos = zip_file.infolist()
+            self.assertIn("dummy_data/nested/test.txt", [info.filename for info in infos])
+            for info in infos:
+                self.assertEqual(info.date_time, (1980, 1, 1, 0, 0, 0))
+                self.assertEqual(info.compress_type, zipfile.ZIP_STORED)
+
+
+class DummyDataInstructionsTest(TestCase):
+    def print_dummy_data_instructions(self, dataset_builder, tmp_dir):
+        mock_dl_manager = MockDownloadManager(
+            dataset_name=dataset_builder.name,
+            config=None,
+            version=Version("0.0.0"),
+            is_local=True,
+            cache_dir=dataset_builder._cache_dir_root,
+            load_existing_dummy_data=False,
+        )
+        path_to_dataset = os.path.join(tmp_dir, dataset_builder.name)
+        os.makedirs(path_to_dataset, exist_ok=True)
+        command = DummyDataCommand(path_to_dataset, False, 5, None, None, None, False, tmp_dir, None)
+        # the dummy data paths returned by the mock download manager are relative
+        cwd = os.getcwd()
+        os.chdir(tmp_dir)
+        try:
+            with redirect_stdout(StringIO()) as output:
+                command._print_dummy_data_instructions(dataset_builder, mock_dl_manager)
+        finally:
+            os.chdir(cwd)
+        return output.getvalue()
+
+    def test_print_dummy_data_instructions_skips_data_dir(self):
+        with TemporaryDirectory() as tmp_dir:
+            dataset_builder = DummyBuilderWithDataDir(cache_dir=os.path.join(tmp_dir, "cache"))
+            output = self.print_dummy_data_instructions(dataset_builder, tmp_dir)
+
+            data_dir = os.path.join("dummy_data", "movies.tar.gz", "movies")
+            self.assertIn(f"'{os.path.join(data_dir, 'train.jsonl')}'", output)
+            self.assertNotIn(f"'{data_dir}'", output)
+            self.assertNotIn(f"{data_dir},", output)
+
+    def test_print_dummy_data_instructions_lists_every_kwarg(self):
+        with TemporaryDirectory() as tmp_dir:
+            dataset_builder = DummyBuilderWithFileLists(cache_dir=os.path.join(tmp_dir, "cache"))
+            output = self.print_dummy_data_instructions(dataset_builder, tmp_dir)
+
+            for name in ("source0.txt", "source1.txt", "target0.txt", "target1.txt"):
+                self.assertIn(os.path.join("dummy_data", name), output)
+
+    def test_print_dummy_data_instructions_runs_generator_until_the_end(self):
+        with TemporaryDirectory() as tmp_dir:
+            data_dir = os.path.join("dummy_data", "files.zip")
+            os.makedirs(os.path.join(tmp_dir, data_dir))
+            with open(os.path.join(tmp_dir, data_dir, "f0.txt"), "w", encoding="utf-8") as f:
+                f.write("foo\n")
+            dataset_builder = DummyBuilderWithFilesInDataDir(cache_dir=os.path.join(tmp_dir, "cache"))
+            output = self.print_dummy_data_instructions(dataset_builder, tmp_dir)
+
+            self.assertIn(f"'{os.path.join(data_dir, 'f1.txt')}'", output)
+            self.assertNotIn("glob.glob", output)
+
+    def test_print_dummy_data_instructions_split_generators_opens_files(self):
+        with TemporaryDirectory() as tmp_dir:
+            dataset_builder = DummyBuilderOpeningFilesInSplitGenerators(cache_dir=os.path.join(tmp_dir, "cache"))
+            output = self.print_dummy_data_instructions(dataset_builder, tmp_dir)
+
+            self.assertIn("seems to already open files in the method `_split_generators(...)`", output)
+            self.assertIn(f"Make sure you create the file {os.path.join('dummy_data', 'splits.txt')}.", output)
+            self.assertNotIn("DUMMY DATA INSTRUCTIONS", output)